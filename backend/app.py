@@ -1,13 +1,26 @@
 
+import math
 import os
-from flask import Flask, request, jsonify, session
+import threading
+import time
+from datetime import date, timedelta
+from flask import Flask, request, jsonify, session, g
 from flask_cors import CORS
 import mysql.connector
 import bcrypt
+from contextlib import contextmanager
 from functools import wraps
 from dotenv import load_dotenv
 load_dotenv()
+import geo
+import profiler
+import ratelimit
+import repositories
+import rollups
+import serialization
 app = Flask(__name__)
+app.json = serialization.FastJSONProvider(app)
+app.after_request(serialization.compress_response)
 
 
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'super-secret-key-2025')
@@ -23,6 +36,34 @@ def get_db_connection():
 CORS(app, supports_credentials=True, origins=["http://localhost:5173"])
 
 
+ARCHIVED_TABLES = ("bookings", "projects", "assignments")
+
+def add_column(cur, table, column, definition):
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME=%s AND COLUMN_NAME=%s
+    """, (table, column))
+    if not cur.fetchone()[0]:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def add_index(cur, table, name, columns):
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME=%s AND INDEX_NAME=%s
+    """, (table, name))
+    if not cur.fetchone()[0]:
+        cur.execute(f"ALTER TABLE {table} ADD INDEX {name} ({columns})")
+
+def mirror_columns(cur, table, copy):
+    """Add to ``copy`` any column ``table`` gained since the copy was created."""
+    cur.execute("""
+        SELECT COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME=%s
+        ORDER BY ORDINAL_POSITION
+    """, (table,))
+    for column, column_type in cur.fetchall():
+        add_column(cur, copy, column, column_type)
+
 def create_tables():
     db = get_db_connection()
     cur = db.cursor()
@@ -37,6 +78,9 @@ def create_tables():
         role VARCHAR(50),
         phone VARCHAR(50),
         skills VARCHAR(500),
+        base_location VARCHAR(255),
+        latitude DOUBLE,
+        longitude DOUBLE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """)
@@ -54,6 +98,8 @@ def create_tables():
         end_date DATE,
         budget DECIMAL(10,2),
         status VARCHAR(50) DEFAULT 'pending',
+        latitude DOUBLE,
+        longitude DOUBLE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """)
@@ -88,6 +134,53 @@ def create_tables():
     )
     """)
 
+    # columns added after the first release
+    add_column(cur, "users", "base_location", "VARCHAR(255)")
+    add_column(cur, "users", "latitude", "DOUBLE")
+    add_column(cur, "users", "longitude", "DOUBLE")
+    add_column(cur, "bookings", "latitude", "DOUBLE")
+    add_column(cur, "bookings", "longitude", "DOUBLE")
+
+    # indexes the archiver and status transitions lock through
+    add_index(cur, "assignments", "idx_assignments_project", "project_id")
+    add_index(cur, "projects", "idx_projects_status_end", "status, end_date")
+    add_index(cur, "projects", "idx_projects_booking", "booking_id")
+
+    # cold storage for completed work, same columns as the live tables
+    for table in ARCHIVED_TABLES:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_archive LIKE {table}")
+        mirror_columns(cur, table, f"{table}_archive")
+
+    # rollups for /api/reports, kept up to date by the write paths
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_utilization (
+        employee_id INT,
+        week_start DATE,
+        assigned_days INT DEFAULT 0,
+        PRIMARY KEY (employee_id, week_start),
+        KEY (week_start)
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_booking_budget (
+        month DATE,
+        status VARCHAR(50),
+        total_budget DECIMAL(14,2) DEFAULT 0,
+        bookings INT DEFAULT 0,
+        PRIMARY KEY (month, status)
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_project_status (
+        month DATE,
+        status VARCHAR(50),
+        projects INT DEFAULT 0,
+        PRIMARY KEY (month, status)
+    )
+    """)
+
     db.commit()
     cur.close()
     db.close()
@@ -96,6 +189,97 @@ def create_tables():
 with app.app_context():
     create_tables()
 
+# -------------------------
+# ADMISSION CONTROL: rate limits + concurrency caps (see ratelimit.py)
+# -------------------------
+RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "1") == "1"
+rate_limiter = ratelimit.backend_from_url(os.getenv("RATELIMIT_REDIS_URL"))
+
+# route class -> (tokens per second, burst) per user (per IP when logged out)
+RATE_LIMITS = {
+    "auth": (0.2, 10),
+    "expensive": (1, 5),
+    "write": (5, 20),
+    "read": (20, 60),
+}
+IP_RATE_LIMIT = (50, 100)
+
+# route class -> requests allowed in flight at once in this worker
+CONCURRENCY_LIMITS = {
+    "auth": ratelimit.ConcurrencyLimiter(int(os.getenv("AUTH_CONCURRENCY", "4"))),
+    "expensive": ratelimit.ConcurrencyLimiter(int(os.getenv("EXPENSIVE_CONCURRENCY", "4"))),
+}
+
+AUTH_ENDPOINTS = {"login", "register"}
+EXPENSIVE_ENDPOINTS = {"dashboard", "admin_all_assignments", "nearby_employees", "report_rebuild"}
+
+def route_class():
+    if request.endpoint in AUTH_ENDPOINTS:
+        return "auth"
+    if request.endpoint in EXPENSIVE_ENDPOINTS:
+        return "expensive"
+    if request.method in ("POST", "PUT", "DELETE"):
+        return "write"
+    return "read"
+
+def rejected(status, msg, retry_after):
+    response = jsonify({"msg": msg})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+@app.before_request
+def admit_request():
+    if not RATELIMIT_ENABLED or request.method == "OPTIONS" or request.endpoint is None:
+        return None
+
+    kind = route_class()
+    client = f"user:{session['user_id']}" if "user_id" in session else f"ip:{request.remote_addr}"
+    checks = [(f"ip:{request.remote_addr}", IP_RATE_LIMIT), (f"{kind}:{client}", RATE_LIMITS[kind])]
+    taken = []
+    try:
+        for key, (rate, burst) in checks:
+            allowed, wait = rate_limiter.take(key, rate, burst)
+            if not allowed:
+                # a rejected request shouldn't use up the other buckets
+                for taken_key, (taken_rate, taken_burst) in taken:
+                    rate_limiter.refund(taken_key, taken_rate, taken_burst)
+                return rejected(429, "Too many requests", wait)
+            taken.append((key, (rate, burst)))
+    except Exception as e:
+        # fail open: an unreachable limiter backend must not take the API down
+        print("Rate limiter error:", e)
+
+    limiter = CONCURRENCY_LIMITS.get(kind)
+    if limiter:
+        if not limiter.acquire():
+            return rejected(503, "Server busy, try again shortly", 1)
+        g.admission_slot = limiter
+    return None
+
+@app.teardown_request
+def release_admission_slot(exc):
+    limiter = g.pop("admission_slot", None)
+    if limiter:
+        limiter.release()
+
+# -------------------------
+# PROFILING: sampled per-route stacks, toggled via /api/admin/profiler
+# -------------------------
+route_profiler = profiler.SamplingProfiler()
+PROFILER_ENDPOINTS = {"admin_profiler", "admin_configure_profiler", "admin_reset_profiler", "admin_profiler_stacks"}
+
+@app.before_request
+def start_profiling():
+    if request.endpoint not in PROFILER_ENDPOINTS and route_profiler.should_profile(request.endpoint):
+        route_profiler.begin(request.endpoint)
+        g.profiled = True
+
+@app.teardown_request
+def stop_profiling(exc):
+    if g.pop("profiled", False):
+        route_profiler.end()
+
 # -------------------------
 # UTIL: DB execute helpers
 # -------------------------
@@ -145,6 +329,334 @@ def execute(query, params=None):
         if cur: cur.close()
         if conn: conn.close()
 
+def executemany(query, seq_params):
+    conn = None
+    cur = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.executemany(query, seq_params)
+        conn.commit()
+    except Exception as e:
+        print("DB executemany error:", e)
+        raise
+    finally:
+        if cur: cur.close()
+        if conn: conn.close()
+
+@contextmanager
+def transaction():
+    """Dictionary cursor whose statements commit (or roll back) together."""
+    conn = get_db_connection()
+    cur = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
+        yield cur
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+def in_params(values):
+    return ",".join(["%s"] * len(values))
+
+def source(table, alias):
+    """``table`` for a FROM clause, or live + archived rows with ?include_archived=1."""
+    if request.args.get("include_archived") == "1":
+        return f"(SELECT * FROM {table} UNION ALL SELECT * FROM {table}_archive) {alias}"
+    return f"{table} {alias}"
+
+def row_by_id(table, row_id):
+    return fetchone(f"SELECT * FROM {table} WHERE id=%s", (row_id,))
+
+# -------------------------
+# REPOSITORIES: cached prepared statements per table (see repositories/)
+# -------------------------
+repo_pool = repositories.ConnectionPool(
+    get_db_connection,
+    size=int(os.getenv("DB_POOL_SIZE", "8")),
+    statement_cache=int(os.getenv("PREPARED_STATEMENT_CACHE", "64")),
+)
+users_repo = repositories.UserRepository(repo_pool)
+bookings_repo = repositories.BookingRepository(repo_pool)
+
+# -------------------------
+# ROLLUPS (incremental, see rollups.py)
+# -------------------------
+ROLLUP_UPSERTS = {
+    "assignments": (rollups.assignment_contrib, """
+        INSERT INTO rollup_utilization (employee_id, week_start, assigned_days)
+        VALUES (%s,%s,%s)
+        ON DUPLICATE KEY UPDATE assigned_days = assigned_days + VALUES(assigned_days)
+    """),
+    "bookings": (rollups.booking_contrib, """
+        INSERT INTO rollup_booking_budget (month, status, total_budget, bookings)
+        VALUES (%s,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE total_budget = total_budget + VALUES(total_budget),
+                                bookings = bookings + VALUES(bookings)
+    """),
+    "projects": (rollups.project_contrib, """
+        INSERT INTO rollup_project_status (month, status, projects)
+        VALUES (%s,%s,%s)
+        ON DUPLICATE KEY UPDATE projects = projects + VALUES(projects)
+    """),
+}
+
+ROLLUP_TABLES = {
+    "assignments": "rollup_utilization",
+    "bookings": "rollup_booking_budget",
+    "projects": "rollup_project_status",
+}
+
+def sync_rollups(table, before=None, after=None):
+    """Apply the rollup delta of one row changing from ``before`` to ``after``.
+
+    ``after`` may be a callable that loads the new row; it is called here so
+    that a failed reload is swallowed too. A failure never fails the request;
+    the reconciliation job fixes any drift.
+    """
+    contrib, query = ROLLUP_UPSERTS[table]
+    try:
+        if callable(after):
+            after = after()
+        delta = rollups.diff(contrib(before), contrib(after))
+        if delta:
+            executemany(query, [key + value for key, value in delta.items()])
+    except Exception as e:
+        print("Rollup sync error:", e)
+
+def rebuild_rollups():
+    """Recompute every rollup table from the base tables in one transaction.
+
+    Returns None without touching anything when another process is already
+    rebuilding (MySQL named lock), so workers never stack full scans.
+    """
+    with transaction() as cur:
+        cur.execute("SELECT GET_LOCK('rollup_rebuild', 0) AS acquired")
+        if not cur.fetchone()["acquired"]:
+            return None
+        try:
+            # archived rows still count towards the history
+            scanned = {}
+            for table, columns in (
+                ("assignments", "employee_id, start_date, end_date, status"),
+                ("bookings", "budget, status, created_at"),
+                ("projects", "end_date, status, created_at"),
+            ):
+                cur.execute(f"SELECT {columns} FROM {table} UNION ALL SELECT {columns} FROM {table}_archive")
+                scanned[table] = cur.fetchall()
+
+            cells = rollups.rebuild(scanned["assignments"], scanned["bookings"], scanned["projects"])
+            for table, rollup_table in ROLLUP_TABLES.items():
+                cur.execute(f"DELETE FROM {rollup_table}")
+                rows = [key + value for key, value in cells[table].items()]
+                if rows:
+                    cur.executemany(ROLLUP_UPSERTS[table][1], rows)
+        finally:
+            cur.execute("SELECT RELEASE_LOCK('rollup_rebuild')")
+            cur.fetchall()
+    return {table: len(cells[table]) for table in ROLLUP_TABLES}
+
+# sync_rollups is best effort, so drift from racing writes is repaired hourly.
+# Every worker starts this thread but the named lock in rebuild_rollups lets
+# only one of them rebuild at a time; set ROLLUP_RECONCILE_SECONDS=0 on all
+# but one process to skip the extra wake-ups. A write whose base row was in
+# the rebuild snapshot but whose sync_rollups ran after it is counted twice
+# until the next rebuild, so keep the interval short enough to bound that.
+ROLLUP_RECONCILE_SECONDS = int(os.getenv("ROLLUP_RECONCILE_SECONDS", "3600"))
+
+def start_rollup_reconciler(interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                rebuild_rollups()
+            except Exception as e:
+                print("Rollup reconcile error:", e)
+
+    threading.Thread(target=run, name="rollup-reconciler", daemon=True).start()
+
+if ROLLUP_RECONCILE_SECONDS > 0:
+    start_rollup_reconciler(ROLLUP_RECONCILE_SECONDS)
+
+# -------------------------
+# GEO: gazetteer lookup + nearest employee index (see geo.py)
+# -------------------------
+GEO_INDEX_TTL = int(os.getenv("GEO_INDEX_TTL", "300"))
+
+employee_index = geo.GeoIndex()
+employee_index_loaded_at = None
+
+def with_coordinates(data, location_key):
+    """Copy of ``data`` with latitude/longitude looked up from ``location_key``.
+
+    Coordinates sent by the client win; when only the location changes the
+    old coordinates are replaced (or cleared if the place is unknown).
+    """
+    if location_key not in data or ("latitude" in data and "longitude" in data):
+        return data
+    lat, lon = geo.lookup(data[location_key]) or (None, None)
+    return {**data, "latitude": lat, "longitude": lon}
+
+def employee_entry(user):
+    payload = {
+        "name": user["name"],
+        "email": user["email"],
+        "phone": user["phone"],
+        "skills": geo.parse_skills(user["skills"]),
+    }
+    return user["id"], user["latitude"], user["longitude"], payload
+
+def get_employee_index():
+    """The in-process index, reloaded every GEO_INDEX_TTL seconds so writes
+    made by other worker processes show up eventually."""
+    global employee_index_loaded_at
+    now = time.monotonic()
+    if employee_index_loaded_at is None or now - employee_index_loaded_at > GEO_INDEX_TTL:
+        users = fetchall("""
+            SELECT id,name,email,phone,skills,latitude,longitude FROM users
+            WHERE role='employee' AND latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+        employee_index.load(employee_entry(u) for u in users)
+        employee_index_loaded_at = now
+    return employee_index
+
+def sync_employee_index(user_id):
+    if employee_index_loaded_at is None:
+        return
+    user = fetchone("SELECT id,name,email,phone,skills,role,latitude,longitude FROM users WHERE id=%s", (user_id,))
+    if user and user["role"] == "employee" and user["latitude"] is not None and user["longitude"] is not None:
+        employee_index.upsert(*employee_entry(user))
+    else:
+        employee_index.remove(user_id)
+
+# -------------------------
+# ARCHIVE: move old completed work to the *_archive tables
+# -------------------------
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.5"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+
+# bookings in these states are archived once none of their projects are live
+CLOSED_BOOKING_STATUSES = ("completed", "rejected")
+
+archive_lock = threading.Lock()
+archive_last_run = {}
+
+def archive_batch(cur, retention_days, batch_size):
+    """Move one batch of completed projects, their assignments and their
+    closed bookings to the archive. Returns how many rows of each moved."""
+    old_project = "status='completed' AND COALESCE(end_date, DATE(created_at)) < CURDATE() - INTERVAL %s DAY"
+    # pick candidates with a plain read, then lock and re-check them by id so
+    # the locking read never walks (and gap-locks) the live table
+    cur.execute(f"SELECT id FROM projects WHERE {old_project} ORDER BY id LIMIT %s", (retention_days, batch_size))
+    candidates = [p["id"] for p in cur.fetchall()]
+    if not candidates:
+        return {}
+    cur.execute(
+        f"SELECT id, booking_id FROM projects WHERE id IN ({in_params(candidates)}) AND {old_project} FOR UPDATE",
+        candidates + [retention_days],
+    )
+    projects = cur.fetchall()
+    if not projects:
+        return {}
+
+    project_ids = [p["id"] for p in projects]
+    moved = {}
+    cur.execute(f"INSERT INTO assignments_archive SELECT * FROM assignments WHERE project_id IN ({in_params(project_ids)})", project_ids)
+    cur.execute(f"DELETE FROM assignments WHERE project_id IN ({in_params(project_ids)})", project_ids)
+    moved["assignments"] = cur.rowcount
+    cur.execute(f"INSERT INTO projects_archive SELECT * FROM projects WHERE id IN ({in_params(project_ids)})", project_ids)
+    cur.execute(f"DELETE FROM projects WHERE id IN ({in_params(project_ids)})", project_ids)
+    moved["projects"] = cur.rowcount
+
+    booking_ids = list({p["booking_id"] for p in projects if p["booking_id"]})
+    moved["bookings"] = 0
+    if booking_ids:
+        cur.execute(f"""
+            SELECT b.id FROM bookings b
+            WHERE b.id IN ({in_params(booking_ids)})
+              AND b.status IN ({in_params(CLOSED_BOOKING_STATUSES)})
+              AND NOT EXISTS (SELECT 1 FROM projects p WHERE p.booking_id = b.id)
+            FOR UPDATE
+        """, booking_ids + list(CLOSED_BOOKING_STATUSES))
+        closed = [b["id"] for b in cur.fetchall()]
+        if closed:
+            cur.execute(f"INSERT INTO bookings_archive SELECT * FROM bookings WHERE id IN ({in_params(closed)})", closed)
+            cur.execute(f"DELETE FROM bookings WHERE id IN ({in_params(closed)})", closed)
+            moved["bookings"] = cur.rowcount
+    return moved
+
+def archive_bookings_batch(cur, retention_days, batch_size):
+    """Move one batch of closed bookings past the retention window that have
+    no live project left, e.g. ones closed after their project was archived."""
+    old_booking = f"""
+        b.status IN ({in_params(CLOSED_BOOKING_STATUSES)})
+        AND COALESCE(b.end_date, DATE(b.created_at)) < CURDATE() - INTERVAL %s DAY
+        AND NOT EXISTS (SELECT 1 FROM projects p WHERE p.booking_id = b.id)
+    """
+    params = list(CLOSED_BOOKING_STATUSES) + [retention_days]
+    cur.execute(f"SELECT b.id FROM bookings b WHERE {old_booking} ORDER BY b.id LIMIT %s", params + [batch_size])
+    candidates = [b["id"] for b in cur.fetchall()]
+    if not candidates:
+        return {}
+    cur.execute(
+        f"SELECT b.id FROM bookings b WHERE b.id IN ({in_params(candidates)}) AND {old_booking} FOR UPDATE",
+        candidates + params,
+    )
+    closed = [b["id"] for b in cur.fetchall()]
+    if not closed:
+        return {}
+    cur.execute(f"INSERT INTO bookings_archive SELECT * FROM bookings WHERE id IN ({in_params(closed)})", closed)
+    cur.execute(f"DELETE FROM bookings WHERE id IN ({in_params(closed)})", closed)
+    return {"bookings": cur.rowcount}
+
+def run_archive(retention_days=None, batch_size=None, pause=None):
+    """Archive in batches, one transaction each, sleeping ``pause`` seconds
+    between batches so live traffic keeps getting the locks and I/O."""
+    retention_days = ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    pause = ARCHIVE_BATCH_PAUSE if pause is None else pause
+
+    if not archive_lock.acquire(blocking=False):
+        return None
+    totals = {"bookings": 0, "projects": 0, "assignments": 0, "batches": 0}
+    try:
+        for archive_pass in (archive_batch, archive_bookings_batch):
+            while True:
+                with transaction() as cur:
+                    moved = archive_pass(cur, retention_days, batch_size)
+                if not moved:
+                    break
+                totals["batches"] += 1
+                for table, count in moved.items():
+                    totals[table] += count
+                time.sleep(pause)
+    except Exception as e:
+        print("Archive run error:", e)
+        totals["error"] = str(e)
+    finally:
+        totals["finished_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        archive_last_run.clear()
+        archive_last_run.update(totals)
+        archive_lock.release()
+    return totals
+
+def start_archiver(interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            run_archive()
+
+    threading.Thread(target=run, name="archiver", daemon=True).start()
+
+if ARCHIVE_INTERVAL_SECONDS > 0:
+    start_archiver(ARCHIVE_INTERVAL_SECONDS)
+
 # -------------------------
 # REGISTER
 # -------------------------
@@ -160,15 +672,19 @@ def register():
         return jsonify({"msg": "Email exists"}), 400
 
     hashed = bcrypt.hashpw(data["password"].encode(), bcrypt.gensalt()).decode()
+    data = with_coordinates(data, "base_location")
 
     try:
-        execute("""
-            INSERT INTO users (name,email,password,role,phone,skills)
-            VALUES (%s,%s,%s,%s,%s,%s)
-        """, (data["name"], data["email"], hashed, data["role"], data.get("phone"), data.get("skills")))
+        new_id = execute("""
+            INSERT INTO users (name,email,password,role,phone,skills,base_location,latitude,longitude)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """, (data["name"], data["email"], hashed, data["role"], data.get("phone"), data.get("skills"),
+              data.get("base_location"), data.get("latitude"), data.get("longitude")))
     except Exception as e:
         return jsonify({"msg": "Register failed", "error": str(e)}), 500
 
+    sync_employee_index(new_id)
+
     return jsonify({"msg": "User registered"})
 
 # -------------------------
@@ -232,48 +748,42 @@ def admin_create_user():
         return jsonify({"msg": "Email exists"}), 400
 
     hashed = bcrypt.hashpw(data["password"].encode(), bcrypt.gensalt()).decode()
+    data = with_coordinates(data, "base_location")
     try:
         new_id = execute("""
-            INSERT INTO users (name,email,password,role,phone,skills)
-            VALUES (%s,%s,%s,%s,%s,%s)
-        """, (data["name"], data["email"], hashed, data["role"], data.get("phone"), data.get("skills")))
+            INSERT INTO users (name,email,password,role,phone,skills,base_location,latitude,longitude)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """, (data["name"], data["email"], hashed, data["role"], data.get("phone"), data.get("skills"),
+              data.get("base_location"), data.get("latitude"), data.get("longitude")))
     except Exception as e:
         return jsonify({"msg": "Create user failed", "error": str(e)}), 500
 
+    sync_employee_index(new_id)
+
     return jsonify({"msg": "User created", "id": new_id})
 
 @app.route("/api/admin/user/<int:user_id>", methods=["PUT"])
 
 def admin_update_user(user_id):
-    data = request.json or {}
+    data = with_coordinates(request.json or {}, "base_location")
     # Only update provided fields (except password handled separately)
     try:
-        user = fetchone("SELECT id FROM users WHERE id=%s", (user_id,))
-        if not user:
+        if not users_repo.get(user_id):
             return jsonify({"msg": "User not found"}), 404
 
-        # update fields
-        fields = []
-        params = []
-        for key in ("name","email","role","phone","skills"):
-            if key in data:
-                fields.append(f"{key}=%s")
-                params.append(data[key])
+        fields = {k: data[k] for k in ("name","email","role","phone","skills","base_location","latitude","longitude") if k in data}
 
         if "password" in data and data["password"]:
-            hashed = bcrypt.hashpw(data["password"].encode(), bcrypt.gensalt()).decode()
-            fields.append("password=%s")
-            params.append(hashed)
+            fields["password"] = bcrypt.hashpw(data["password"].encode(), bcrypt.gensalt()).decode()
 
         if not fields:
             return jsonify({"msg": "No fields to update"}), 400
 
-        params.append(user_id)
-        query = "UPDATE users SET " + ", ".join(fields) + " WHERE id=%s"
-        execute(query, tuple(params))
+        users_repo.update(user_id, fields)
     except Exception as e:
         return jsonify({"msg": "Update failed", "error": str(e)}), 500
 
+    sync_employee_index(user_id)
     return jsonify({"msg": "User updated"})
 
 @app.route("/api/admin/user/<int:user_id>", methods=["DELETE"])
@@ -283,6 +793,7 @@ def admin_delete_user(user_id):
         execute("DELETE FROM users WHERE id=%s", (user_id,))
     except Exception as e:
         return jsonify({"msg": "Delete failed", "error": str(e)}), 500
+    sync_employee_index(user_id)
     return jsonify({"msg": "User deleted"})
 
 # -------------------------
@@ -300,18 +811,19 @@ def list_employees():
 @app.route("/api/bookings", methods=["POST"])
 
 def create_booking():
-    data = request.json or {}
+    data = with_coordinates(request.json or {}, "location")
     required = ["title", "description"]
     if not all(k in data and data[k] for k in required):
         return jsonify({"msg": "Missing fields"}), 400
 
     try:
-        execute("""
+        booking_id = execute("""
     INSERT INTO bookings (
         client_id, title, description, location,
-        required_skills, start_date, end_date, budget, status
+        required_skills, start_date, end_date, budget, status,
+        latitude, longitude
     )
-    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
 """, (
     session["user_id"],
     data["title"],
@@ -321,19 +833,23 @@ def create_booking():
     data.get("start_date"),
     data.get("end_date"),
     data.get("budget"),
-    data.get("status") or "pending"
+    data.get("status") or "pending",
+    data.get("latitude"),
+    data.get("longitude")
 ))
 
     except Exception as e:
         return jsonify({"msg": "Booking failed", "error": str(e)}), 500
 
+    sync_rollups("bookings", after=row_by_id("bookings", booking_id))
+
     return jsonify({"msg": "Booking submitted"})
 
 # Client: view own bookings
 @app.route("/api/bookings/mine", methods=["GET"])
 
 def client_my_bookings():
-    rows = fetchall("SELECT * FROM bookings WHERE client_id=%s ORDER BY created_at DESC", (session["user_id"],))
+    rows = fetchall(f"SELECT * FROM {source('bookings', 'b')} WHERE client_id=%s ORDER BY created_at DESC", (session["user_id"],))
     return jsonify(rows)
 
 
@@ -341,27 +857,25 @@ def client_my_bookings():
 @app.route("/api/bookings/<int:booking_id>", methods=["PUT"])
 
 def client_update_booking(booking_id):
-    data = request.json or {}
-    booking = fetchone("SELECT * FROM bookings WHERE id=%s AND client_id=%s", (booking_id, session["user_id"]))
+    data = with_coordinates(request.json or {}, "location")
+    try:
+        booking = bookings_repo.get(booking_id, client_id=session["user_id"])
+    except Exception as e:
+        return jsonify({"msg": "Update failed", "error": str(e)}), 500
     if not booking:
         return jsonify({"msg": "Booking not found or access denied"}), 404
 
-    fields = []
-    params = []
-    for key in ("title","description","location","required_skills","start_date","end_date","budget","status"):
-        if key in data:
-            fields.append(f"{key}=%s")
-            params.append(data[key])
-
+    fields = {k: data[k] for k in ("title","description","location","required_skills","start_date","end_date","budget","status","latitude","longitude") if k in data}
     if not fields:
         return jsonify({"msg": "No fields to update"}), 400
 
-    params.append(booking_id)
     try:
-        execute("UPDATE bookings SET " + ", ".join(fields) + " WHERE id=%s", tuple(params))
+        bookings_repo.update(booking_id, fields)
     except Exception as e:
         return jsonify({"msg": "Update failed", "error": str(e)}), 500
 
+    sync_rollups("bookings", booking, lambda: bookings_repo.get(booking_id))
+
     return jsonify({"msg": "Booking updated"})
 
 # Client: delete own booking
@@ -375,6 +889,7 @@ def client_delete_booking(booking_id):
         execute("DELETE FROM bookings WHERE id=%s", (booking_id,))
     except Exception as e:
         return jsonify({"msg": "Delete failed", "error": str(e)}), 500
+    sync_rollups("bookings", booking)
     return jsonify({"msg": "Booking deleted"})
 
 # -------------------------
@@ -387,18 +902,226 @@ def get_bookings():
     status = request.args.get("status")
     unassigned = request.args.get("unassigned")  # if "1" filter bookings with no project
     if unassigned == "1":
-        rows = fetchall("""
-            SELECT b.* FROM bookings b
-            LEFT JOIN projects p ON p.booking_id = b.id
+        # a booking whose project was archived is still taken care of
+        rows = fetchall(f"""
+            SELECT b.* FROM {source('bookings', 'b')}
+            LEFT JOIN {source('projects', 'p')} ON p.booking_id = b.id
             WHERE p.id IS NULL
+              AND NOT EXISTS (SELECT 1 FROM projects_archive pa WHERE pa.booking_id = b.id)
             ORDER BY b.created_at DESC
         """)
     elif status:
-        rows = fetchall("SELECT * FROM bookings WHERE status=%s ORDER BY created_at DESC", (status,))
+        rows = fetchall(f"SELECT * FROM {source('bookings', 'b')} WHERE status=%s ORDER BY created_at DESC", (status,))
+    else:
+        rows = fetchall(f"SELECT * FROM {source('bookings', 'b')} ORDER BY created_at DESC")
+    return jsonify(rows)
+
+# -------------------------
+# MANAGER: Nearest available crew for a booking
+# -------------------------
+@app.route("/api/bookings/<int:booking_id>/nearby-employees", methods=["GET"])
+def nearby_employees(booking_id):
+    if session.get("role") not in ("admin", "manager"):
+        return jsonify({"msg": "Access denied"}), 403
+
+    booking = row_by_id("bookings", booking_id)
+    if not booking:
+        return jsonify({"msg": "Booking not found"}), 404
+
+    if booking["latitude"] is not None and booking["longitude"] is not None:
+        point = (booking["latitude"], booking["longitude"])
     else:
-        rows = fetchall("SELECT * FROM bookings ORDER BY created_at DESC")
+        point = geo.lookup(booking["location"])
+    if not point:
+        return jsonify({"msg": "Booking location is unknown"}), 422
+
+    k = min(max(request.args.get("k", 10, type=int), 1), 100)
+    required = geo.parse_skills(booking["required_skills"])
+    match_any = request.args.get("match") == "any"
+
+    # employees already on an assignment that overlaps the booking dates
+    busy = {row["employee_id"] for row in fetchall("""
+        SELECT DISTINCT employee_id FROM assignments
+        WHERE status IN ('assigned','working')
+          AND (start_date IS NULL OR %s IS NULL OR start_date <= %s)
+          AND (end_date IS NULL OR %s IS NULL OR end_date >= %s)
+    """, (booking["end_date"], booking["end_date"], booking["start_date"], booking["start_date"]))}
+
+    def available(emp_id, emp):
+        if emp_id in busy:
+            return False
+        if not required:
+            return True
+        return bool(required & emp["skills"]) if match_any else required <= emp["skills"]
+
+    rows = [
+        {
+            "id": emp_id,
+            "name": emp["name"],
+            "email": emp["email"],
+            "phone": emp["phone"],
+            "skills": ", ".join(sorted(emp["skills"])),
+            "distance_km": distance,
+        }
+        for emp_id, distance, emp in get_employee_index().nearest(point[0], point[1], k, available)
+    ]
     return jsonify(rows)
 
+# -------------------------
+# STATUS TRANSITIONS (assignments + projects)
+# -------------------------
+# current status -> statuses it may move to
+ASSIGNMENT_TRANSITIONS = {
+    "assigned": {"working", "completed", "rejected"},
+    "working": {"assigned", "completed"},
+    "completed": {"working"},
+    "rejected": {"assigned"},
+}
+PROJECT_TRANSITIONS = {
+    "planned": {"active", "completed"},
+    "active": {"planned", "completed"},
+    "completed": {"active"},
+}
+MAX_BATCH_IDS = 1000
+
+def can_transition(machine, current, new):
+    # rows written before the state machine existed may hold other statuses
+    return new == current or current not in machine or new in machine[current]
+
+def complete_finished_projects(cur, project_ids):
+    """Mark completed every project in ``project_ids`` whose assignments are
+    all completed or rejected (with at least one completed). Returns the
+    project rows as they were before."""
+    project_ids = [pid for pid in set(project_ids) if pid]
+    if not project_ids:
+        return []
+    cur.execute(f"""
+        SELECT p.* FROM projects p
+        WHERE p.id IN ({in_params(project_ids)})
+          AND p.status <> 'completed'
+          AND EXISTS (SELECT 1 FROM assignments a WHERE a.project_id = p.id AND a.status = 'completed')
+          AND NOT EXISTS (
+              SELECT 1 FROM assignments a
+              WHERE a.project_id = p.id AND a.status NOT IN ('completed','rejected')
+          )
+        FOR UPDATE
+    """, project_ids)
+    projects = [p for p in cur.fetchall() if can_transition(PROJECT_TRANSITIONS, p["status"], "completed")]
+    if projects:
+        ids = [p["id"] for p in projects]
+        cur.execute(f"UPDATE projects SET status='completed' WHERE id IN ({in_params(ids)})", ids)
+    return projects
+
+def sync_completed_projects(projects):
+    for project in projects:
+        sync_rollups("projects", project, {**project, "status": "completed"})
+
+def transition_assignments(new_status, ids=None, project_id=None, employee_id=None, fields=None):
+    """Move assignments to ``new_status`` with one set-based UPDATE.
+
+    Targets either ``ids`` (all must exist and be allowed to move) or every
+    non-rejected assignment of ``project_id``. ``employee_id`` restricts the
+    change to that employee's own assignments. ``fields`` are other columns
+    to set in the same UPDATE; with them ``new_status`` may be None to leave
+    the status alone. Returns (body, http status).
+    """
+    fields = dict(fields or {})
+    if new_status is not None or not fields:
+        if new_status not in ASSIGNMENT_TRANSITIONS:
+            return {"msg": "Invalid status"}, 400
+        fields["status"] = new_status
+
+    with transaction() as cur:
+        # every path locks projects before assignments (complete_finished_projects
+        # runs last), so two transitions can never wait on each other in a cycle
+        if ids is not None:
+            cur.execute(f"SELECT DISTINCT project_id FROM assignments WHERE id IN ({in_params(ids)})", list(ids))
+            project_ids = {row["project_id"] for row in cur.fetchall()}
+        else:
+            project_ids = {project_id}
+        if fields.get("project_id"):
+            project_ids.add(fields["project_id"])
+        project_ids = [pid for pid in project_ids if pid]
+        if project_ids:
+            cur.execute(f"SELECT id FROM projects WHERE id IN ({in_params(project_ids)}) ORDER BY id FOR UPDATE", project_ids)
+            locked = cur.fetchall()
+            if project_id is not None and not locked:
+                return {"msg": "Project not found"}, 404
+        elif project_id is not None:
+            return {"msg": "Project not found"}, 404
+
+        if ids is not None:
+            query = f"SELECT * FROM assignments WHERE id IN ({in_params(ids)})"
+            params = list(ids)
+        else:
+            query = "SELECT * FROM assignments WHERE project_id=%s AND status <> 'rejected'"
+            params = [project_id]
+        if employee_id is not None:
+            query += " AND employee_id=%s"
+            params.append(employee_id)
+        cur.execute(query + " FOR UPDATE", params)
+        rows = cur.fetchall()
+
+        missing = sorted(set(ids or []) - {row["id"] for row in rows})
+        if missing:
+            return {"msg": "Assignment not found or access denied", "ids": missing}, 404
+        blocked = [row["id"] for row in rows if not can_transition(ASSIGNMENT_TRANSITIONS, row["status"], fields.get("status", row["status"]))]
+        if blocked:
+            return {"msg": f"Cannot move these assignments to {new_status}", "ids": blocked}, 409
+
+        changed = [row for row in rows if any(row[k] != v for k, v in fields.items())]
+        after = {}
+        if changed:
+            changed_ids = [row["id"] for row in changed]
+            columns = ", ".join(f"{column}=%s" for column in fields)
+            cur.execute(
+                f"UPDATE assignments SET {columns} WHERE id IN ({in_params(changed_ids)})",
+                list(fields.values()) + changed_ids,
+            )
+            if set(fields) != {"status"}:
+                cur.execute(f"SELECT * FROM assignments WHERE id IN ({in_params(changed_ids)})", changed_ids)
+                after = {row["id"]: row for row in cur.fetchall()}
+        # the projects the assignments left may be done now, as may the ones they joined
+        completed = complete_finished_projects(
+            cur, [row["project_id"] for row in changed] + [row["project_id"] for row in after.values()]
+        )
+
+    for row in changed:
+        sync_rollups("assignments", row, after.get(row["id"]) or {**row, **fields})
+    sync_completed_projects(completed)
+    return {
+        "msg": "Status updated",
+        "updated": [row["id"] for row in changed],
+        "completed_projects": [p["id"] for p in completed],
+    }, 200
+
+@app.route("/api/assignments/status", methods=["PUT"])
+def batch_update_assignment_status():
+    if session.get("role") not in ("admin", "manager"):
+        return jsonify({"msg": "Access denied"}), 403
+    data = request.json or {}
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids or not all(type(i) is int for i in ids):
+        return jsonify({"msg": "ids must be a non-empty list of assignment ids"}), 400
+    if len(ids) > MAX_BATCH_IDS:
+        return jsonify({"msg": f"At most {MAX_BATCH_IDS} ids per request"}), 400
+    try:
+        body, status = transition_assignments(data.get("status"), ids=sorted(set(ids)))
+    except Exception as e:
+        return jsonify({"msg": "Update failed", "error": str(e)}), 500
+    return jsonify(body), status
+
+@app.route("/api/projects/<int:project_id>/assignments/status", methods=["PUT"])
+def project_update_assignment_status(project_id):
+    if session.get("role") not in ("admin", "manager"):
+        return jsonify({"msg": "Access denied"}), 403
+    data = request.json or {}
+    try:
+        body, status = transition_assignments(data.get("status"), project_id=project_id)
+    except Exception as e:
+        return jsonify({"msg": "Update failed", "error": str(e)}), 500
+    return jsonify(body), status
+
 # -------------------------
 # MANAGER: Projects CRUD
 # -------------------------
@@ -424,6 +1147,7 @@ def create_project():
         ))
     except Exception as e:
         return jsonify({"msg": "Create project failed", "error": str(e)}), 500
+    sync_rollups("projects", after=row_by_id("projects", pid))
     return jsonify({"msg": "Project created", "project_id": pid})
 
 @app.route("/api/projects", methods=["GET"])
@@ -431,49 +1155,59 @@ def create_project():
 def list_projects():
     # employees can optionally see projects they're assigned to
     if session["role"] == "employee":
-        rows = fetchall("""
-            SELECT p.* FROM projects p
-            JOIN assignments a ON a.project_id = p.id
+        rows = fetchall(f"""
+            SELECT p.* FROM {source('projects', 'p')}
+            JOIN {source('assignments', 'a')} ON a.project_id = p.id
             WHERE a.employee_id=%s
             ORDER BY p.created_at DESC
         """, (session["user_id"],))
     else:
-        rows = fetchall("SELECT * FROM projects ORDER BY created_at DESC")
+        rows = fetchall(f"SELECT * FROM {source('projects', 'p')} ORDER BY created_at DESC")
     return jsonify(rows)
 
 @app.route("/api/projects/<int:project_id>", methods=["PUT"])
 
 def update_project(project_id):
     data = request.json or {}
-    project = fetchone("SELECT * FROM projects WHERE id=%s", (project_id,))
-    if not project:
-        return jsonify({"msg": "Project not found"}), 404
-
-    fields = []
-    params = []
-    for key in ("project_name","start_date","end_date","notes","status","manager_id","booking_id"):
-        if key in data:
-            fields.append(f"{key}=%s")
-            params.append(data[key])
+    fields = {k: data[k] for k in ("project_name","start_date","end_date","notes","status","manager_id","booking_id") if k in data}
     if not fields:
         return jsonify({"msg": "No fields to update"}), 400
-    params.append(project_id)
+    if "status" in fields and fields["status"] not in PROJECT_TRANSITIONS:
+        return jsonify({"msg": "Invalid status"}), 400
+
     try:
-        execute("UPDATE projects SET " + ", ".join(fields) + " WHERE id=%s", tuple(params))
+        with transaction() as cur:
+            # lock the row so the status check still holds when the UPDATE runs
+            cur.execute("SELECT * FROM projects WHERE id=%s FOR UPDATE", (project_id,))
+            project = cur.fetchone()
+            if not project:
+                return jsonify({"msg": "Project not found"}), 404
+            if "status" in fields and not can_transition(PROJECT_TRANSITIONS, project["status"], fields["status"]):
+                return jsonify({"msg": f"Cannot move project from {project['status']} to {fields['status']}"}), 409
+            columns = ", ".join(f"{column}=%s" for column in fields)
+            cur.execute(f"UPDATE projects SET {columns} WHERE id=%s", list(fields.values()) + [project_id])
+            cur.execute("SELECT * FROM projects WHERE id=%s", (project_id,))
+            updated = cur.fetchone()
     except Exception as e:
         return jsonify({"msg": "Update failed", "error": str(e)}), 500
+    sync_rollups("projects", project, updated)
     return jsonify({"msg": "Project updated"})
 
 @app.route("/api/projects/<int:project_id>", methods=["DELETE"])
 
 def delete_project(project_id):
-    if not fetchone("SELECT id FROM projects WHERE id=%s", (project_id,)):
+    project = row_by_id("projects", project_id)
+    if not project:
         return jsonify({"msg": "Project not found"}), 404
+    assignments = fetchall("SELECT * FROM assignments WHERE project_id=%s", (project_id,))
     try:
         execute("DELETE FROM assignments WHERE project_id=%s", (project_id,))
         execute("DELETE FROM projects WHERE id=%s", (project_id,))
     except Exception as e:
         return jsonify({"msg": "Delete failed", "error": str(e)}), 500
+    for assn in assignments:
+        sync_rollups("assignments", assn)
+    sync_rollups("projects", project)
     return jsonify({"msg": "Project and its assignments deleted"})
 
 # -------------------------
@@ -563,6 +1297,7 @@ def create_assignment():
             data.get("end_date"),
             data.get("status") or "assigned"
         ))
+        sync_rollups("assignments", after=row_by_id("assignments", aid))
 
         # SEND EMAIL
         send_assignment_email(
@@ -584,41 +1319,42 @@ def create_assignment():
 
 def list_assignments():
     if session["role"] == "employee":
-        rows = fetchall("SELECT * FROM assignments WHERE employee_id=%s ORDER BY created_at DESC", (session["user_id"],))
+        rows = fetchall(f"SELECT * FROM {source('assignments', 'a')} WHERE employee_id=%s ORDER BY created_at DESC", (session["user_id"],))
     else:
-        rows = fetchall("SELECT * FROM assignments ORDER BY created_at DESC")
+        rows = fetchall(f"SELECT * FROM {source('assignments', 'a')} ORDER BY created_at DESC")
     return jsonify(rows)
 
 @app.route("/api/assignments/<int:assign_id>", methods=["PUT"])
 
 def update_assignment(assign_id):
-    if not fetchone("SELECT id FROM assignments WHERE id=%s", (assign_id,)):
-        return jsonify({"msg": "Assignment not found"}), 404
     data = request.json or {}
-    fields = []
-    params = []
-    for key in ("project_id","employee_id","role_desc","start_date","end_date","status"):
-        if key in data:
-            fields.append(f"{key}=%s")
-            params.append(data[key])
-    if not fields:
+    fields = {k: data[k] for k in ("project_id","employee_id","role_desc","start_date","end_date") if k in data}
+    if not fields and "status" not in data:
         return jsonify({"msg": "No fields to update"}), 400
-    params.append(assign_id)
+    if "status" in data and data["status"] not in ASSIGNMENT_TRANSITIONS:
+        return jsonify({"msg": "Invalid status"}), 400
     try:
-        execute("UPDATE assignments SET " + ", ".join(fields) + " WHERE id=%s", tuple(params))
+        # status checks, the UPDATE and project auto-complete share one locked transaction
+        body, status = transition_assignments(data.get("status"), ids=[assign_id], fields=fields)
     except Exception as e:
         return jsonify({"msg": "Update failed", "error": str(e)}), 500
-    return jsonify({"msg": "Assignment updated"})
+    if status == 404:
+        body = {"msg": "Assignment not found"}
+    elif status == 200:
+        body = {"msg": "Assignment updated"}
+    return jsonify(body), status
 
 @app.route("/api/assignments/<int:assign_id>", methods=["DELETE"])
 
 def delete_assignment(assign_id):
-    if not fetchone("SELECT id FROM assignments WHERE id=%s", (assign_id,)):
+    assn = row_by_id("assignments", assign_id)
+    if not assn:
         return jsonify({"msg": "Assignment not found"}), 404
     try:
         execute("DELETE FROM assignments WHERE id=%s", (assign_id,))
     except Exception as e:
         return jsonify({"msg": "Delete failed", "error": str(e)}), 500
+    sync_rollups("assignments", assn)
     return jsonify({"msg": "Assignment deleted"})
 
 # -------------------------
@@ -627,18 +1363,14 @@ def delete_assignment(assign_id):
 @app.route("/api/assignments/<int:assign_id>/status", methods=["PUT"])
 
 def employee_update_status(assign_id):
-    assn = fetchone("SELECT * FROM assignments WHERE id=%s AND employee_id=%s", (assign_id, session["user_id"]))
-    if not assn:
-        return jsonify({"msg": "Assignment not found or access denied"}), 404
     data = request.json or {}
-    new_status = data.get("status")
-    if new_status not in ("assigned","working","completed","rejected"):
-        return jsonify({"msg": "Invalid status"}), 400
     try:
-        execute("UPDATE assignments SET status=%s WHERE id=%s", (new_status, assign_id))
+        body, status = transition_assignments(data.get("status"), ids=[assign_id], employee_id=session["user_id"])
     except Exception as e:
         return jsonify({"msg": "Update failed", "error": str(e)}), 500
-    return jsonify({"msg": "Status updated"})
+    if status == 404:
+        body = {"msg": "Assignment not found or access denied"}
+    return jsonify(body), status
 
 # -------------------------
 # ADMIN: Bookings/Projects/Assignments CRUD (convenience endpoints)
@@ -646,14 +1378,21 @@ def employee_update_status(assign_id):
 @app.route("/api/admin/bookings", methods=["GET"])
 
 def admin_list_bookings():
-    rows = fetchall("SELECT * FROM bookings ORDER BY created_at DESC")
+    rows = fetchall(f"SELECT * FROM {source('bookings', 'b')} ORDER BY created_at DESC")
     return jsonify(rows)
 
 @app.route("/api/admin/bookings/<int:booking_id>", methods=["DELETE"])
 
 def admin_delete_booking(booking_id):
-    if not fetchone("SELECT id FROM bookings WHERE id=%s", (booking_id,)):
+    booking = row_by_id("bookings", booking_id)
+    if not booking:
         return jsonify({"msg": "Booking not found"}), 404
+    projects = fetchall("SELECT * FROM projects WHERE booking_id=%s", (booking_id,))
+    assignments = fetchall("""
+        SELECT a.* FROM assignments a
+        JOIN projects p ON p.id = a.project_id
+        WHERE p.booking_id=%s
+    """, (booking_id,))
     try:
         # delete related projects & assignments
         execute("DELETE FROM assignments WHERE project_id IN (SELECT id FROM projects WHERE booking_id=%s)", (booking_id,))
@@ -661,8 +1400,83 @@ def admin_delete_booking(booking_id):
         execute("DELETE FROM bookings WHERE id=%s", (booking_id,))
     except Exception as e:
         return jsonify({"msg": "Delete failed", "error": str(e)}), 500
+    for assn in assignments:
+        sync_rollups("assignments", assn)
+    for project in projects:
+        sync_rollups("projects", project)
+    sync_rollups("bookings", booking)
     return jsonify({"msg": "Booking and related data deleted"})
 
+@app.route("/api/admin/archive", methods=["GET"])
+def admin_archive_status():
+    if session.get("role") != "admin":
+        return jsonify({"msg": "Access denied"}), 403
+    counts = {t: fetchone(f"SELECT COUNT(*) as c FROM {t}_archive")["c"] for t in ARCHIVED_TABLES}
+    return jsonify({"archived": counts, "running": archive_lock.locked(), "last_run": archive_last_run})
+
+@app.route("/api/admin/archive/run", methods=["POST"])
+def admin_archive_run():
+    if session.get("role") != "admin":
+        return jsonify({"msg": "Access denied"}), 403
+    if archive_lock.locked():
+        return jsonify({"msg": "Archive run already in progress"}), 409
+
+    data = request.json or {}
+    for key in ("retention_days", "batch_size"):
+        value = data.get(key)
+        if value is not None and (type(value) is not int or value < 0):
+            return jsonify({"msg": f"{key} must be a non-negative integer"}), 400
+
+    threading.Thread(
+        target=run_archive,
+        kwargs={"retention_days": data.get("retention_days"), "batch_size": data.get("batch_size")},
+        name="archiver-manual",
+        daemon=True,
+    ).start()
+    return jsonify({"msg": "Archive run started"}), 202
+
+@app.route("/api/admin/profiler", methods=["GET"])
+def admin_profiler():
+    if session.get("role") != "admin":
+        return jsonify({"msg": "Access denied"}), 403
+    return jsonify(route_profiler.summary())
+
+@app.route("/api/admin/profiler", methods=["PUT"])
+def admin_configure_profiler():
+    if session.get("role") != "admin":
+        return jsonify({"msg": "Access denied"}), 403
+    data = request.json or {}
+    routes = data.get("routes")
+    if routes is not None and not (isinstance(routes, list) and all(r in app.view_functions for r in routes)):
+        return jsonify({"msg": "routes must be a list of endpoint names"}), 400
+    interval_ms = data.get("interval_ms")
+    if interval_ms is not None and type(interval_ms) not in (int, float):
+        return jsonify({"msg": "interval_ms must be a number"}), 400
+    try:
+        route_profiler.configure(
+            enabled=data.get("enabled"),
+            sample_rate=data.get("sample_rate"),
+            routes=routes,
+            interval=interval_ms / 1000 if interval_ms is not None else None,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"msg": "Invalid profiler settings", "error": str(e)}), 400
+    return jsonify(route_profiler.summary())
+
+@app.route("/api/admin/profiler", methods=["DELETE"])
+def admin_reset_profiler():
+    if session.get("role") != "admin":
+        return jsonify({"msg": "Access denied"}), 403
+    route_profiler.reset()
+    return jsonify({"msg": "Profiler samples cleared"})
+
+@app.route("/api/admin/profiler/stacks", methods=["GET"])
+def admin_profiler_stacks():
+    if session.get("role") != "admin":
+        return jsonify({"msg": "Access denied"}), 403
+    # folded stacks, e.g. curl ... | flamegraph.pl > route.svg
+    return route_profiler.collapsed(request.args.get("route")), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
 # -------------------------
 # DASHBOARD COUNTS (admin/manager)
 # -------------------------
@@ -673,17 +1487,17 @@ def dashboard():
     total_managers = fetchone("SELECT COUNT(*) as c FROM users WHERE role='manager'")["c"]
     total_clients = fetchone("SELECT COUNT(*) as c FROM users WHERE role='client'")["c"]
 
-    total_bookings = fetchone("SELECT COUNT(*) as c FROM bookings")["c"]
-    pending_bookings = fetchone("SELECT COUNT(*) as c FROM bookings WHERE status='pending'")["c"]
-    approved_bookings = fetchone("SELECT COUNT(*) as c FROM bookings WHERE status='approved'")["c"]
+    total_bookings = fetchone(f"SELECT COUNT(*) as c FROM {source('bookings', 'b')}")["c"]
+    pending_bookings = fetchone(f"SELECT COUNT(*) as c FROM {source('bookings', 'b')} WHERE status='pending'")["c"]
+    approved_bookings = fetchone(f"SELECT COUNT(*) as c FROM {source('bookings', 'b')} WHERE status='approved'")["c"]
 
-    total_projects = fetchone("SELECT COUNT(*) as c FROM projects")["c"]
-    active_projects = fetchone("SELECT COUNT(*) as c FROM projects WHERE status='active'")["c"]
-    completed_projects = fetchone("SELECT COUNT(*) as c FROM projects WHERE status='completed'")["c"]
+    total_projects = fetchone(f"SELECT COUNT(*) as c FROM {source('projects', 'p')}")["c"]
+    active_projects = fetchone(f"SELECT COUNT(*) as c FROM {source('projects', 'p')} WHERE status='active'")["c"]
+    completed_projects = fetchone(f"SELECT COUNT(*) as c FROM {source('projects', 'p')} WHERE status='completed'")["c"]
 
-    total_assignments = fetchone("SELECT COUNT(*) as c FROM assignments")["c"]
-    working_assignments = fetchone("SELECT COUNT(*) as c FROM assignments WHERE status='working'")["c"]
-    completed_assignments = fetchone("SELECT COUNT(*) as c FROM assignments WHERE status='completed'")["c"]
+    total_assignments = fetchone(f"SELECT COUNT(*) as c FROM {source('assignments', 'a')}")["c"]
+    working_assignments = fetchone(f"SELECT COUNT(*) as c FROM {source('assignments', 'a')} WHERE status='working'")["c"]
+    completed_assignments = fetchone(f"SELECT COUNT(*) as c FROM {source('assignments', 'a')} WHERE status='completed'")["c"]
 
     return jsonify({
         "users": total_users,
@@ -709,16 +1523,16 @@ def dashboard():
 @app.route("/api/admin/bookings", methods=["POST"])
 
 def admin_create_booking():
-    data = request.json or {}
+    data = with_coordinates(request.json or {}, "location")
 
     required = ["client_id", "title", "description"]
     if not all(k in data and data[k] for k in required):
         return jsonify({"msg": "Missing fields"}), 400
 
     try:
-        execute("""
-            INSERT INTO bookings (client_id,title,description,location,required_skills,start_date,end_date,budget,status)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        booking_id = execute("""
+            INSERT INTO bookings (client_id,title,description,location,required_skills,start_date,end_date,budget,status,latitude,longitude)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
         """, (
             data["client_id"],
             data["title"],
@@ -728,11 +1542,14 @@ def admin_create_booking():
             data.get("start_date"),
             data.get("end_date"),
             data.get("budget"),
-            data.get("status") or "pending"
+            data.get("status") or "pending",
+            data.get("latitude"),
+            data.get("longitude")
         ))
     except Exception as e:
         return jsonify({"msg": "Create failed", "error": str(e)}), 500
 
+    sync_rollups("bookings", after=row_by_id("bookings", booking_id))
     return jsonify({"msg": "Booking created"})
 
 @app.route("/api/employee/tasks", methods=["GET"])
@@ -740,7 +1557,7 @@ def employee_tasks():
     if session.get("role") != "employee":
         return jsonify({"msg": "Access denied"}), 403
 
-    rows = fetchall("""
+    rows = fetchall(f"""
         SELECT 
             a.id,
             a.project_id,
@@ -756,9 +1573,9 @@ def employee_tasks():
             b.location AS booking_location,
             b.start_date AS booking_start,
             b.end_date AS booking_end
-        FROM assignments a
-        JOIN projects p ON p.id = a.project_id
-        JOIN bookings b ON b.id = p.booking_id
+        FROM {source('assignments', 'a')}
+        JOIN {source('projects', 'p')} ON p.id = a.project_id
+        JOIN {source('bookings', 'b')} ON b.id = p.booking_id
         WHERE a.employee_id = %s
         ORDER BY a.created_at DESC
     """, (session["user_id"],))
@@ -767,17 +1584,17 @@ def employee_tasks():
 
 @app.route("/api/assignments/all", methods=["GET"])
 def admin_all_assignments():
-    rows = fetchall("""
+    rows = fetchall(f"""
         SELECT 
             a.*,
             u.name AS employee_name,
             p.project_name,
             b.location AS booking_location,
             b.title AS booking_title
-        FROM assignments a
+        FROM {source('assignments', 'a')}
         LEFT JOIN users u ON u.id = a.employee_id
-        LEFT JOIN projects p ON p.id = a.project_id
-        LEFT JOIN bookings b ON b.id = p.booking_id
+        LEFT JOIN {source('projects', 'p')} ON p.id = a.project_id
+        LEFT JOIN {source('bookings', 'b')} ON b.id = p.booking_id
         ORDER BY a.created_at DESC
     """)
     return jsonify(rows)
@@ -785,32 +1602,110 @@ def admin_all_assignments():
 @app.route("/api/admin/bookings/<int:booking_id>", methods=["PUT"])
 
 def admin_update_booking(booking_id):
-    data = request.json or {}
+    data = with_coordinates(request.json or {}, "location")
 
-    booking = fetchone("SELECT id FROM bookings WHERE id=%s", (booking_id,))
+    try:
+        booking = bookings_repo.get(booking_id)
+    except Exception as e:
+        return jsonify({"msg": 'Update failed', "error": str(e)}), 500
     if not booking:
         return jsonify({"msg": "Booking not found"}), 404
 
-    fields = []
-    params = []
-
-    for key in ("client_id", "title", "description", "location", "required_skills", "start_date", "end_date", "budget", "status"):
-        if key in data:
-            fields.append(f"{key}=%s")
-            params.append(data[key])
+    fields = {k: data[k] for k in ("client_id", "title", "description", "location", "required_skills", "start_date", "end_date", "budget", "status", "latitude", "longitude") if k in data}
 
     if not fields:
         return jsonify({"msg": "No fields to update"}), 400
 
-    params.append(booking_id)
-
     try:
-        execute(f"UPDATE bookings SET {', '.join(fields)} WHERE id=%s", tuple(params))
+        bookings_repo.update(booking_id, fields)
     except Exception as e:
         return jsonify({"msg": 'Update failed', "error": str(e)}), 500
 
+    sync_rollups("bookings", booking, lambda: bookings_repo.get(booking_id))
     return jsonify({"msg": "Booking updated"})
 
+# -------------------------
+# REPORTS (served from the rollup tables)
+# -------------------------
+def report_range(snap, default_start, parse=rollups.to_date):
+    """Read ``from``/``to`` query args, snapped to the start of their bucket."""
+    end = snap(parse(request.args.get("to")) or date.today())
+    start = parse(request.args.get("from"))
+    return (snap(start) if start else default_start(end)), end
+
+def parse_month(value):
+    # months come in as YYYY-MM, full dates are accepted too
+    return rollups.to_date(f"{value}-01" if value and len(value) == 7 else value)
+
+@app.route("/api/reports/utilization", methods=["GET"])
+def report_utilization():
+    if session.get("role") not in ("admin", "manager"):
+        return jsonify({"msg": "Access denied"}), 403
+
+    start, end = report_range(rollups.week_start, lambda end: end - timedelta(weeks=11))
+    query = """
+        SELECT employee_id, week_start, assigned_days
+        FROM rollup_utilization
+        WHERE week_start BETWEEN %s AND %s
+    """
+    params = [start, end]
+    if request.args.get("employee_id"):
+        query += " AND employee_id=%s"
+        params.append(request.args["employee_id"])
+    rows = fetchall(query + " ORDER BY week_start, employee_id", tuple(params))
+
+    for row in rows:
+        row["utilization"] = round(row["assigned_days"] / 7, 3)
+    return jsonify(rows)
+
+@app.route("/api/reports/budget", methods=["GET"])
+def report_budget():
+    if session.get("role") not in ("admin", "manager"):
+        return jsonify({"msg": "Access denied"}), 403
+
+    start, end = report_range(rollups.month_start, lambda end: end.replace(year=end.year - 1), parse_month)
+
+    query = """
+        SELECT month, status, total_budget, bookings
+        FROM rollup_booking_budget
+        WHERE month BETWEEN %s AND %s
+    """
+    params = [start, end]
+    if request.args.get("status"):
+        query += " AND status=%s"
+        params.append(request.args["status"])
+    return jsonify(fetchall(query + " ORDER BY month, status", tuple(params)))
+
+@app.route("/api/reports/throughput", methods=["GET"])
+def report_throughput():
+    if session.get("role") not in ("admin", "manager"):
+        return jsonify({"msg": "Access denied"}), 403
+
+    start, end = report_range(rollups.month_start, lambda end: end.replace(year=end.year - 1), parse_month)
+
+    query = """
+        SELECT month, status, projects
+        FROM rollup_project_status
+        WHERE month BETWEEN %s AND %s
+    """
+    params = [start, end]
+    if request.args.get("status"):
+        query += " AND status=%s"
+        params.append(request.args["status"])
+    return jsonify(fetchall(query + " ORDER BY month, status", tuple(params)))
+
+@app.route("/api/reports/rebuild", methods=["POST"])
+def report_rebuild():
+    if session.get("role") != "admin":
+        return jsonify({"msg": "Access denied"}), 403
+    try:
+        cells = rebuild_rollups()
+    except Exception as e:
+        return jsonify({"msg": "Rebuild failed", "error": str(e)}), 500
+    if cells is None:
+        return jsonify({"msg": "Rebuild already running"}), 409
+    return jsonify({"msg": "Rollups rebuilt", "cells": cells})
+
 if __name__ == "__main__":
 
     app.run(debug=True)
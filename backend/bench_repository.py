@@ -0,0 +1,77 @@
+"""CPU and allocation cost of the Python side of an update request.
+
+Usage: python bench_repository.py [iterations]
+
+Compares what the update routes used to do per request (build the UPDATE
+text from the keys present, turn result rows into dicts the way the
+dictionary cursor does) with the repository layer (cached statement,
+slotted records). The server-side saving from prepared statements needs a
+live MySQL and is not measured here.
+"""
+import sys
+import timeit
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+
+from repositories import BookingRepository
+from repositories.base import update_sql
+
+COLUMNS = BookingRepository.columns
+ROW = (42, 7, "Villa foundation", "Pour and cure", "Anna Nagar, Chennai", "mason, carpenter",
+       date(2025, 3, 1), date(2025, 4, 15), Decimal("125000.00"), "approved", 13.0827, 80.2707,
+       datetime(2025, 2, 20, 9, 30))
+DATA = {"status": "completed", "budget": "130000.00", "end_date": "2025-04-30"}
+KEYS = ("client_id", "title", "description", "location", "required_skills", "start_date", "end_date", "budget", "status")
+
+
+def old_request():
+    before = dict(zip(COLUMNS, ROW))
+    fields = []
+    params = []
+    for key in KEYS:
+        if key in DATA:
+            fields.append(f"{key}=%s")
+            params.append(DATA[key])
+    params.append(42)
+    query = f"UPDATE bookings SET {', '.join(fields)} WHERE id=%s"
+    after = dict(zip(COLUMNS, ROW))
+    return before, query, tuple(params), after
+
+
+repo = BookingRepository(pool=None)
+order = {column: i for i, column in enumerate(BookingRepository.updatable)}
+
+
+def new_request():
+    before = repo.record(*ROW)
+    fields = {k: DATA[k] for k in KEYS if k in DATA}
+    columns = tuple(sorted(fields, key=order.__getitem__))
+    query = update_sql("bookings", columns)
+    params = tuple(fields[c] for c in columns) + (42,)
+    after = repo.record(*ROW)
+    return before, query, params, after
+
+
+def allocations(fn, n):
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    keep = [fn() for _ in range(n)]
+    stats = tracemalloc.take_snapshot().compare_to(snapshot, "filename")
+    tracemalloc.stop()
+    del keep
+    return sum(s.size_diff for s in stats) / n, sum(s.count_diff for s in stats) / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{n} simulated update requests (booking row, 3 changed fields)")
+    print(f"{'path':<12}{'us/request':>12}{'bytes kept':>12}{'blocks kept':>13}")
+    for name, fn in (("dict + text", old_request), ("repository", new_request)):
+        seconds = min(timeit.repeat(fn, number=n, repeat=5)) / n
+        size, count = allocations(fn, 10000)
+        print(f"{name:<12}{seconds * 1e6:>12.2f}{size:>12.0f}{count:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
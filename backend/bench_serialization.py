@@ -0,0 +1,80 @@
+"""Encode time and bytes on the wire for an admin_all_assignments payload.
+
+Usage: python bench_serialization.py [rows] [repeat]
+
+The rows are synthetic but shaped like the ``/api/assignments/all`` query
+(assignment columns plus the joined employee, project and booking names),
+so no database is needed.
+"""
+import gzip
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import serialization
+
+
+def make_rows(n):
+    rng = random.Random(42)
+    rows = []
+    for i in range(1, n + 1):
+        start = date(2024, 1, 1) + timedelta(days=rng.randint(0, 600))
+        rows.append({
+            "id": i,
+            "project_id": rng.randint(1, n // 10 + 1),
+            "employee_id": rng.randint(1, n // 5 + 1),
+            "assigned_by": rng.randint(1, 20),
+            "role_desc": rng.choice(["Mason", "Electrician", "Site supervisor", "Plumber", None]),
+            "start_date": start,
+            "end_date": start + timedelta(days=rng.randint(1, 90)),
+            "status": rng.choice(["assigned", "working", "completed", "rejected"]),
+            "created_at": datetime(2024, 1, 1, 8) + timedelta(minutes=rng.randint(0, 10**6)),
+            "employee_name": f"Employee {rng.randint(1, 5000)}",
+            "project_name": f"Project {rng.randint(1, 800)} - Phase {rng.randint(1, 4)}",
+            "booking_location": rng.choice(["Anna Nagar, Chennai", "Gandhipuram, Coimbatore", "KK Nagar, Madurai"]),
+            "booking_title": f"Booking {rng.randint(1, 2000)}",
+        })
+    return rows
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = make_rows(n)
+
+    app = Flask(__name__)
+    flask_default = DefaultJSONProvider(app)
+    encoders = {"flask-default": lambda obj: flask_default.dumps(obj).encode()}
+    for name, encode in serialization.ENCODERS.items():
+        encoders[name] = encode
+    if serialization.msgpack:
+        encoders["msgpack"] = serialization._dumps_msgpack
+
+    compressors = {"gzip": lambda b: gzip.compress(b, compresslevel=serialization.COMPRESS_LEVEL)}
+    if serialization.brotli:
+        compressors["br"] = lambda b: serialization.brotli.compress(b, quality=serialization.COMPRESS_LEVEL)
+
+    print(f"{n} rows, best of {repeat}")
+    header = f"{'encoder':<15}{'encode ms':>11}{'bytes':>11}"
+    for name in compressors:
+        header += f"{name + ' bytes':>13}{name + ' ms':>10}"
+    print(header)
+
+    with app.app_context():
+        for name, encode in encoders.items():
+            seconds = min(timeit.repeat(lambda: encode(rows), number=1, repeat=repeat))
+            body = encode(rows)
+            line = f"{name:<15}{seconds * 1000:>11.2f}{len(body):>11}"
+            for compress in compressors.values():
+                packed = compress(body)
+                compress_seconds = min(timeit.repeat(lambda: compress(body), number=1, repeat=3))
+                line += f"{len(packed):>13}{compress_seconds * 1000:>10.2f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
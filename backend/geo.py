@@ -0,0 +1,177 @@
+"""Offline geocoding and nearest-employee search.
+
+Coordinates come from a local gazetteer CSV (``name,latitude,longitude``),
+so nothing here ever touches the network. ``GeoIndex`` keeps employee
+positions in a k-d tree that is patched on every user write.
+"""
+import csv
+import heapq
+import math
+import os
+import re
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv")
+)
+
+_gazetteer = None
+
+
+def _normalise(text):
+    return re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split()
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    places = {}
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                places[" ".join(_normalise(row["name"]))] = (float(row["latitude"]), float(row["longitude"]))
+    except OSError as e:
+        print("Gazetteer load error:", e)
+    return places
+
+
+def lookup(location):
+    """(latitude, longitude) for free-text ``location`` or None.
+
+    Addresses end with the city, state and PIN, while earlier parts often
+    name roads after other towns ("Trichy Road, Coimbatore 641018"). So the
+    comma separated parts are tried from the last one backwards, and within
+    a part the word runs ending nearest its end win, longest run first.
+    """
+    global _gazetteer
+    if not isinstance(location, str) or not location:
+        return None
+    if _gazetteer is None:
+        _gazetteer = load_gazetteer()
+
+    hit = _gazetteer.get(" ".join(_normalise(location)))
+    if hit:
+        return hit
+    for part in reversed(location.split(",")):
+        words = _normalise(part)
+        for end in range(len(words), 0, -1):
+            for start in range(end):
+                hit = _gazetteer.get(" ".join(words[start:end]))
+                if hit:
+                    return hit
+    return None
+
+
+def parse_skills(text):
+    return frozenset(s.strip().lower() for s in (text or "").split(",") if s.strip())
+
+
+def _unit_vector(lat, lon):
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _dist2(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+def _chord_to_km(d2):
+    return 2 * math.asin(min(1.0, math.sqrt(d2) / 2)) * EARTH_RADIUS_KM
+
+
+def _build(points, depth=0):
+    if not points:
+        return None
+    axis = depth % 3
+    points.sort(key=lambda p: p[0][axis])
+    mid = len(points) // 2
+    return (points[mid][0], points[mid][1], axis, _build(points[:mid], depth + 1), _build(points[mid + 1:], depth + 1))
+
+
+class GeoIndex:
+    """k-d tree of id -> (latitude, longitude, payload).
+
+    Points are stored as unit vectors, so straight-line distance orders
+    them exactly like great-circle distance. Inserts, moves and removals
+    go to a small overlay that is scanned linearly; the tree is rebuilt
+    once the overlay outgrows ``rebuild_ratio`` of the index.
+    """
+
+    def __init__(self, rebuild_ratio=0.1):
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = threading.Lock()
+        self._points = {}
+        self._tree = None
+        self._pending = set()
+
+    def __len__(self):
+        return len(self._points)
+
+    def load(self, items):
+        """Replace the whole index with (id, latitude, longitude, payload) items."""
+        points = {item_id: (_unit_vector(lat, lon), payload) for item_id, lat, lon, payload in items}
+        tree = _build([(xyz, item_id) for item_id, (xyz, _) in points.items()])
+        with self._lock:
+            self._points, self._tree, self._pending = points, tree, set()
+
+    def upsert(self, item_id, lat, lon, payload=None):
+        with self._lock:
+            self._points[item_id] = (_unit_vector(lat, lon), payload)
+            self._pending.add(item_id)
+            self._maybe_rebuild()
+
+    def remove(self, item_id):
+        with self._lock:
+            if self._points.pop(item_id, None) is not None:
+                self._pending.add(item_id)
+                self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if len(self._pending) > max(32, self.rebuild_ratio * len(self._points)):
+            self._tree = _build([(xyz, item_id) for item_id, (xyz, _) in self._points.items()])
+            self._pending = set()
+
+    def nearest(self, lat, lon, k, accept=None):
+        """Up to ``k`` (id, distance_km, payload) tuples, closest first.
+
+        ``accept(id, payload)`` filters candidates during the search.
+        """
+        target = _unit_vector(lat, lon)
+        with self._lock:
+            points, tree, pending = self._points, self._tree, set(self._pending)
+
+        heap = []  # max-heap on distance via negated keys
+
+        def consider(xyz, item_id):
+            entry = points.get(item_id)
+            if entry is None or (accept and not accept(item_id, entry[1])):
+                return
+            d2 = _dist2(target, xyz)
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, item_id, entry[1]))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, item_id, entry[1]))
+
+        def search(node):
+            if node is None:
+                return
+            xyz, item_id, axis, left, right = node
+            if item_id not in pending:
+                consider(xyz, item_id)
+            diff = target[axis] - xyz[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            search(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                search(far)
+
+        if k > 0:
+            search(tree)
+            for item_id in pending:
+                entry = points.get(item_id)
+                if entry is not None:
+                    consider(entry[0], item_id)
+
+        return [
+            (item_id, round(_chord_to_km(-neg_d2), 3), payload)
+            for neg_d2, item_id, payload in sorted(heap, key=lambda entry: entry[:2], reverse=True)
+        ]
@@ -0,0 +1,141 @@
+"""Low-overhead statistical profiler for Flask routes.
+
+Requests picked by ``should_profile`` register their thread with ``begin``.
+While at least one such request is in flight, a background thread wakes
+every ``interval`` seconds, grabs the current stack of each registered
+thread from ``sys._current_frames()`` and counts it under the route name.
+Unprofiled requests only pay for one attribute check and a ``random()``.
+
+``collapsed`` exports the counts in the folded-stack format read by
+flamegraph.pl, speedscope and inferno.
+"""
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f"{name} must be a number")
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be finite")
+    return float(value)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, max_depth=128):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.routes = set()
+        self.interval = interval
+        self.max_depth = max_depth
+
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> route
+        self._stacks = defaultdict(Counter)  # route -> collapsed stack -> samples
+        self._requests = Counter()
+        self._sampler = None
+
+    def configure(self, enabled=None, sample_rate=None, routes=None, interval=None):
+        """Change any of the settings; all are validated before any is applied.
+
+        Raises TypeError/ValueError (and changes nothing) on a bad value.
+        """
+        if enabled is not None and not isinstance(enabled, bool):
+            raise TypeError("enabled must be true or false")
+        changes = {}
+        if enabled is not None:
+            changes["enabled"] = enabled
+        if sample_rate is not None:
+            changes["sample_rate"] = min(max(_number(sample_rate, "sample_rate"), 0.0), 1.0)
+        if routes is not None:
+            changes["routes"] = set(routes)
+        if interval is not None:
+            changes["interval"] = max(_number(interval, "interval"), 0.001)
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+
+    def should_profile(self, route):
+        if not self.enabled or route is None:
+            return False
+        if self.routes and route not in self.routes:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def begin(self, route):
+        with self._lock:
+            self._active[threading.get_ident()] = route
+            self._requests[route] += 1
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run, name="route-profiler", daemon=True)
+                self._sampler.start()
+
+    def end(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    # nothing in flight: stop and let the next begin() restart us
+                    self._sampler = None
+                    return
+                active = dict(self._active)
+            frames = sys._current_frames()
+            samples = []
+            for thread_id, route in active.items():
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(route)
+                samples.append((route, ";".join(reversed(stack))))
+            del frames
+            with self._lock:
+                for route, stack in samples:
+                    self._stacks[route][stack] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._requests.clear()
+
+    def summary(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "routes": sorted(self.routes),
+                "interval_ms": round(self.interval * 1000, 3),
+                "profiled": {
+                    route: {"requests": self._requests[route], "samples": sum(self._stacks[route].values())}
+                    for route in self._requests
+                },
+            }
+
+    def collapsed(self, route=None):
+        """Folded stacks, one ``frame;frame;frame count`` line each."""
+        with self._lock:
+            routes = [route] if route else list(self._stacks)
+            lines = [
+                f"{stack} {count}"
+                for r in routes
+                for stack, count in self._stacks.get(r, {}).items()
+            ]
+        return "\n".join(sorted(lines)) + ("\n" if lines else "")
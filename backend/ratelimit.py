@@ -0,0 +1,117 @@
+"""Token-bucket rate limiting and concurrency limits for admission control.
+
+``MemoryBackend`` keeps buckets in this process; ``RedisBackend`` keeps them
+in Redis so every worker shares the same budget. Both answer
+``take(key, rate, burst)`` with ``(allowed, retry_after_seconds)``.
+
+``ConcurrencyLimiter`` caps how many requests of one class run at once in
+this worker, which in turn caps the DB connections they can hold.
+"""
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class MemoryBackend:
+    """Per-process buckets; idle full buckets are pruned as keys pile up."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                allowed, wait = True, 0.0
+            else:
+                allowed, wait = False, (cost - tokens) / rate
+            # the third field is when the bucket is full again, i.e. forgettable
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            if len(self._buckets) > self.max_keys:
+                self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+        return allowed, wait
+
+    def refund(self, key, rate, burst, cost=1):
+        """Give back tokens taken by a request that was rejected elsewhere."""
+        with self._lock:
+            if key in self._buckets:
+                tokens, stamp, _ = self._buckets[key]
+                tokens = min(burst, tokens + cost)
+                self._buckets[key] = (tokens, stamp, stamp + (burst - tokens) / rate)
+
+
+class RedisBackend:
+    """Buckets shared by every worker through one Redis hash per key."""
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+    local tokens = tonumber(state[1]) or burst
+    local stamp = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - stamp) * rate)
+    local allowed = 0
+    local wait = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        wait = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'stamp', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+    return {allowed, tostring(wait)}
+    """
+
+    REFUND_SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+    if tokens then
+        redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2])))
+    end
+    return 1
+    """
+
+    def __init__(self, url, prefix="ratelimit:", timeout=0.05):
+        if redis is None:
+            raise RuntimeError("RATELIMIT_REDIS_URL is set but the redis package is not installed")
+        self.prefix = prefix
+        # a slow limiter must not become the slowest part of every request
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._refund = self._client.register_script(self.REFUND_SCRIPT)
+
+    def take(self, key, rate, burst, cost=1):
+        allowed, wait = self._script(keys=[self.prefix + key], args=[rate, burst, time.time(), cost])
+        return bool(allowed), float(wait)
+
+    def refund(self, key, rate, burst, cost=1):
+        self._refund(keys=[self.prefix + key], args=[burst, cost])
+
+
+def backend_from_url(url):
+    return RedisBackend(url) if url else MemoryBackend()
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests of one class in flight in this worker."""
+
+    def __init__(self, limit, queue_timeout=0.5):
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        return self._slots.acquire(timeout=self.queue_timeout)
+
+    def release(self):
+        self._slots.release()
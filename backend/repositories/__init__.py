@@ -0,0 +1,16 @@
+"""One repository per table; see base.py for how statements are cached."""
+from .assignments import AssignmentRepository
+from .base import ConnectionPool, Repository, record_type
+from .bookings import BookingRepository
+from .projects import ProjectRepository
+from .users import UserRepository
+
+__all__ = [
+    "AssignmentRepository",
+    "BookingRepository",
+    "ConnectionPool",
+    "ProjectRepository",
+    "Repository",
+    "UserRepository",
+    "record_type",
+]
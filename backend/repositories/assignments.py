@@ -0,0 +1,8 @@
+from .base import Repository
+
+
+class AssignmentRepository(Repository):
+    table = "assignments"
+    columns = ("id", "project_id", "employee_id", "assigned_by", "role_desc",
+               "start_date", "end_date", "status", "created_at")
+    updatable = ("project_id", "employee_id", "role_desc", "start_date", "end_date", "status")
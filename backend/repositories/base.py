@@ -0,0 +1,146 @@
+"""Shared plumbing for the per-table repositories.
+
+Statements are generated once per column subset and cached, then run on
+server-side prepared cursors that stay prepared for as long as their pooled
+connection lives. Rows come back as compact ``__slots__`` records instead
+of one dict per row.
+"""
+import queue
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import make_dataclass
+from functools import lru_cache
+
+
+def record_type(name, columns):
+    """Slotted record class that also answers ``row["col"]`` and ``row.get``,
+    so code written against dictionary cursors keeps working."""
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    return make_dataclass(
+        name,
+        columns,
+        namespace={"__getitem__": __getitem__, "get": get},
+        eq=False,
+        slots=True,
+    )
+
+
+@lru_cache(maxsize=None)
+def select_sql(table, columns, where):
+    conditions = " AND ".join(f"{column}=%s" for column in where)
+    return f"SELECT {', '.join(columns)} FROM {table} WHERE {conditions}"
+
+
+@lru_cache(maxsize=None)
+def update_sql(table, columns):
+    return f"UPDATE {table} SET {', '.join(f'{column}=%s' for column in columns)} WHERE id=%s"
+
+
+class ConnectionPool:
+    """Small LIFO pool; each connection keeps its own prepared cursors.
+
+    Every connection holds at most ``statement_cache`` prepared cursors; the
+    least recently used one is closed (deallocating it on the server) to
+    make room, so the pool never needs more than ``size * statement_cache``
+    of MySQL's global max_prepared_stmt_count. Connections idle for longer
+    than ``recycle`` seconds are replaced so the server's wait_timeout never
+    hands us a dead one. A connection that raises is dropped together with
+    its cursors.
+    """
+
+    def __init__(self, connect, size=8, recycle=300, statement_cache=64):
+        self._connect = connect
+        self.recycle = recycle
+        self.statement_cache = statement_cache
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _checkout(self):
+        while True:
+            try:
+                conn, statements, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), OrderedDict()
+            if time.monotonic() - last_used < self.recycle:
+                return conn, statements
+            self._discard(conn, statements)
+
+    @staticmethod
+    def _discard(conn, statements):
+        try:
+            for cur in statements.values():
+                cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def statements(self):
+        """Yield ``prepare(sql) -> cursor``, committing when the block ends."""
+        conn, statements = self._checkout()
+
+        def prepare(sql):
+            cur = statements.get(sql)
+            if cur is not None:
+                statements.move_to_end(sql)
+                return cur
+            if len(statements) >= self.statement_cache:
+                _, evicted = statements.popitem(last=False)
+                evicted.close()
+            cur = statements[sql] = conn.cursor(prepared=True)
+            return cur
+
+        try:
+            yield prepare
+            # commit reads too, so the next user of this connection gets a fresh snapshot
+            conn.commit()
+        except Exception:
+            self._discard(conn, statements)
+            raise
+        try:
+            self._idle.put_nowait((conn, statements, time.monotonic()))
+        except queue.Full:
+            self._discard(conn, statements)
+
+
+class Repository:
+    table = None
+    columns = ()
+    updatable = ()
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.record = record_type(self.__class__.__name__.replace("Repository", "Record"), self.columns)
+        self._order = {column: i for i, column in enumerate(self.updatable)}
+
+    def get(self, row_id, **where):
+        """The row with ``id=row_id`` (and every ``where`` column matching) or None."""
+        keys = ("id",) + tuple(sorted(where))
+        sql = select_sql(self.table, self.columns, keys)
+        with self.pool.statements() as prepare:
+            cur = prepare(sql)
+            cur.execute(sql, (row_id,) + tuple(where[k] for k in keys[1:]))
+            row = cur.fetchone()
+            cur.fetchall()  # drain so the cursor can be reused
+        return self.record(*row) if row else None
+
+    def update(self, row_id, fields):
+        """UPDATE the updatable columns present in ``fields``; returns rows changed.
+
+        mysql-connector reports rows whose values actually changed, so an
+        UPDATE that matches but rewrites identical values returns 0.
+        """
+        columns = tuple(sorted((c for c in fields if c in self._order), key=self._order.__getitem__))
+        if not columns:
+            return 0
+        sql = update_sql(self.table, columns)
+        with self.pool.statements() as prepare:
+            cur = prepare(sql)
+            cur.execute(sql, tuple(fields[c] for c in columns) + (row_id,))
+            return cur.rowcount
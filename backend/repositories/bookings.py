@@ -0,0 +1,9 @@
+from .base import Repository
+
+
+class BookingRepository(Repository):
+    table = "bookings"
+    columns = ("id", "client_id", "title", "description", "location", "required_skills",
+               "start_date", "end_date", "budget", "status", "latitude", "longitude", "created_at")
+    updatable = ("client_id", "title", "description", "location", "required_skills",
+                 "start_date", "end_date", "budget", "status", "latitude", "longitude")
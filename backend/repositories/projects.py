@@ -0,0 +1,8 @@
+from .base import Repository
+
+
+class ProjectRepository(Repository):
+    table = "projects"
+    columns = ("id", "booking_id", "manager_id", "project_name", "start_date", "end_date",
+               "notes", "status", "created_at")
+    updatable = ("project_name", "start_date", "end_date", "notes", "status", "manager_id", "booking_id")
@@ -0,0 +1,10 @@
+from .base import Repository
+
+
+class UserRepository(Repository):
+    table = "users"
+    # password is writable but never read back through the repository
+    columns = ("id", "name", "email", "role", "phone", "skills",
+               "base_location", "latitude", "longitude", "created_at")
+    updatable = ("name", "email", "role", "phone", "skills",
+                 "base_location", "latitude", "longitude", "password")
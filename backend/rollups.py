@@ -0,0 +1,174 @@
+"""Rollups behind the /api/reports endpoints.
+
+Each ``*_contrib`` helper turns one base-table row into the rollup cells it
+adds to. Write paths diff the contribution of the row before and after a
+change and apply only the difference; ``rebuild`` recomputes every cell from
+scratch for the reconciliation job and for backfills.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# assignments in these states don't take up any of the employee's time
+IDLE_ASSIGNMENT_STATUSES = ("rejected",)
+
+
+def to_date(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def assignment_contrib(row):
+    """{(employee_id, week_start): (assigned_days,)} for one assignment."""
+    if not row or not row.get("employee_id") or row.get("status") in IDLE_ASSIGNMENT_STATUSES:
+        return {}
+    start = to_date(row.get("start_date"))
+    end = to_date(row.get("end_date"))
+    start, end = start or end, end or start
+    if start is None or end < start:
+        return {}
+
+    out = {}
+    day = start
+    while day <= end:
+        week = week_start(day)
+        last = min(end, week + timedelta(days=6))
+        out[(int(row["employee_id"]), week)] = ((last - day).days + 1,)
+        day = last + timedelta(days=1)
+    return out
+
+
+def booking_contrib(row):
+    """{(month, status): (budget, bookings)} for one booking."""
+    if not row:
+        return {}
+    month = month_start(to_date(row.get("created_at")) or date.today())
+    budget = Decimal(str(row.get("budget") or 0))
+    return {(month, row.get("status") or "pending"): (budget, 1)}
+
+
+def project_contrib(row):
+    """{(month, status): (projects,)} for one project, bucketed by end date."""
+    if not row:
+        return {}
+    day = to_date(row.get("end_date")) or to_date(row.get("created_at")) or date.today()
+    return {(month_start(day), row.get("status") or "planned"): (1,)}
+
+
+def diff(before, after):
+    """Cells of ``after`` minus ``before``, without the ones that cancel out."""
+    delta = dict(after)
+    for key, value in before.items():
+        current = delta.get(key, (0,) * len(value))
+        delta[key] = tuple(a - b for a, b in zip(current, value))
+    return {k: v for k, v in delta.items() if any(v)}
+
+
+def _accumulate(rows, contrib):
+    out = {}
+    for row in rows:
+        for key, value in contrib(row).items():
+            if key in out:
+                out[key] = tuple(a + b for a, b in zip(out[key], value))
+            else:
+                out[key] = value
+    return out
+
+
+# -------------------------
+# Vectorised rebuild
+# -------------------------
+def _utilization_np(rows):
+    emp, start, end = [], [], []
+    for row in rows:
+        if not row.get("employee_id") or row.get("status") in IDLE_ASSIGNMENT_STATUSES:
+            continue
+        s, e = to_date(row.get("start_date")), to_date(row.get("end_date"))
+        s, e = s or e, e or s
+        if s is None or e < s:
+            continue
+        emp.append(int(row["employee_id"]))
+        start.append(s.toordinal())
+        end.append(e.toordinal())
+    if not emp:
+        return {}
+
+    emp = np.asarray(emp, dtype=np.int64)
+    start = np.asarray(start, dtype=np.int64)
+    lengths = np.asarray(end, dtype=np.int64) - start + 1
+
+    # expand every assignment into one entry per assigned day
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    days = np.repeat(start, lengths) + offsets
+    weeks = days - (days - 1) % 7  # ordinal 1 (0001-01-01) is a Monday
+    keys, counts = np.unique(np.stack([np.repeat(emp, lengths), weeks], axis=1), axis=0, return_counts=True)
+    return {(int(e), date.fromordinal(int(w))): (int(c),) for (e, w), c in zip(keys, counts)}
+
+
+def _month_status_np(rows, month_of, status_default, cents_of=None):
+    if not rows:
+        return {}
+    months = np.asarray([month_of(row).toordinal() for row in rows], dtype=np.int64)
+    labels, status = np.unique([row.get("status") or status_default for row in rows], return_inverse=True)
+    keys, inverse, counts = np.unique(
+        np.stack([months, status.astype(np.int64)], axis=1), axis=0, return_inverse=True, return_counts=True
+    )
+    inverse = inverse.reshape(-1)
+    if cents_of is None:
+        return {(date.fromordinal(int(m)), str(labels[s])): (int(c),) for (m, s), c in zip(keys, counts)}
+
+    totals = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(totals, inverse, np.asarray([cents_of(row) for row in rows], dtype=np.int64))
+    return {
+        (date.fromordinal(int(m)), str(labels[s])): (Decimal(int(t)).scaleb(-2), int(c))
+        for (m, s), t, c in zip(keys, totals, counts)
+    }
+
+
+def rebuild(assignments, bookings, projects):
+    """Recompute all three rollups from full table scans.
+
+    Uses NumPy when it is installed and falls back to replaying the
+    incremental contributions otherwise; both give the same cells.
+    """
+    if np is None:
+        return {
+            "assignments": _accumulate(assignments, assignment_contrib),
+            "bookings": _accumulate(bookings, booking_contrib),
+            "projects": _accumulate(projects, project_contrib),
+        }
+
+    return {
+        "assignments": _utilization_np(assignments),
+        "bookings": _month_status_np(
+            bookings,
+            lambda row: month_start(to_date(row.get("created_at")) or date.today()),
+            "pending",
+            lambda row: int(Decimal(str(row.get("budget") or 0)).scaleb(2)),
+        ),
+        "projects": _month_status_np(
+            projects,
+            lambda row: month_start(to_date(row.get("end_date")) or to_date(row.get("created_at")) or date.today()),
+            "planned",
+        ),
+    }
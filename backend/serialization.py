@@ -0,0 +1,127 @@
+"""Response encoding: fast JSON, optional MessagePack and compression.
+
+``FastJSONProvider`` replaces Flask's JSON provider so every ``jsonify``
+call goes through it. Rows from the dictionary cursors carry ``Decimal``
+budgets and ``date``/``datetime`` values; those are encoded as strings and
+ISO-8601 respectively whichever encoder is in use, so clients see the same
+payload whether orjson is installed or not.
+
+Clients that send ``Accept: application/msgpack`` get MessagePack instead
+of JSON, and ``compress_response`` gzips/brotlis large bodies.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson" if orjson else "json")
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+
+def default(o):
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    if isinstance(o, (set, frozenset)):
+        return sorted(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _dumps_orjson(obj):
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _dumps_json(obj):
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _dumps_msgpack(obj):
+    return msgpack.packb(obj, default=default, use_bin_type=True)
+
+
+ENCODERS = {"json": _dumps_json}
+if orjson:
+    ENCODERS["orjson"] = _dumps_orjson
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider with a pluggable encoder (``JSON_ENCODER`` env var)."""
+
+    def __init__(self, app, encoder=JSON_ENCODER):
+        super().__init__(app)
+        self.encode = ENCODERS[encoder]
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return json.dumps(obj, default=default, **kwargs)
+        return self.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if msgpack and wants_msgpack():
+            response = self._app.response_class(_dumps_msgpack(obj), mimetype=MSGPACK_MIMETYPE)
+        else:
+            response = self._app.response_class(self.encode(obj), mimetype=self.mimetype)
+        response.vary.add("Accept")
+        return response
+
+
+def wants_msgpack():
+    accept = request.accept_mimetypes
+    return accept.quality(MSGPACK_MIMETYPE) > accept.quality("application/json")
+
+
+def compress_response(response):
+    """after_request hook: brotli or gzip bodies above COMPRESS_MIN_BYTES."""
+    if (
+        response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    offered = ["br", "gzip"] if brotli else ["gzip"]
+    encoding = request.accept_encodings.best_match(offered)
+    if encoding == "br":
+        response.set_data(brotli.compress(body, quality=COMPRESS_LEVEL))
+    elif encoding == "gzip":
+        response.set_data(gzip.compress(body, compresslevel=COMPRESS_LEVEL))
+    else:
+        return response
+
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,47 @@
+import pytest
+
+import geo
+
+CHENNAI = (13.0827, 80.2707)
+COIMBATORE = (11.0168, 76.9558)
+ERODE = (11.3410, 77.7172)
+NEW_DELHI = (28.6139, 77.2090)
+
+
+@pytest.mark.parametrize("location, expected", [
+    ("Trichy Road, Coimbatore 641018", COIMBATORE),
+    ("Salem Main Road, Erode - 638001", ERODE),
+    ("12 MG Road, Anna Nagar, Chennai", CHENNAI),
+    ("Madurai Road, Chennai, Tamil Nadu 600001", CHENNAI),
+    ("Anna Nagar, New Delhi 110001", NEW_DELHI),
+    ("Coimbatore", COIMBATORE),
+])
+def test_lookup_prefers_the_end_of_the_address(location, expected):
+    assert geo.lookup(location) == expected
+
+
+def test_lookup_unknown_place():
+    assert geo.lookup("Somewhere Unlisted, 000000") is None
+    assert geo.lookup("") is None
+
+
+@pytest.mark.parametrize("location", [None, 600001, 13.08, ["Chennai"], {"city": "Chennai"}])
+def test_lookup_ignores_non_text(location):
+    assert geo.lookup(location) is None
+
+
+def test_nearest_matches_brute_force_after_writes():
+    index = geo.GeoIndex()
+    points = {i: (8 + (i * 37 % 1200) / 100, 72 + (i * 53 % 1600) / 100) for i in range(2000)}
+    index.load((i, lat, lon, None) for i, (lat, lon) in points.items())
+    for i in range(0, 100):
+        points[i] = (13.0 + i / 1000, 80.0 + i / 1000)
+        index.upsert(i, *points[i])
+    for i in range(100, 150):
+        index.remove(i)
+        del points[i]
+
+    found = index.nearest(*CHENNAI, 5)
+    target = geo._unit_vector(*CHENNAI)
+    expected = sorted(points, key=lambda i: geo._dist2(target, geo._unit_vector(*points[i])))[:5]
+    assert [item_id for item_id, _, _ in found] == expected
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+import profiler
+
+
+def settings(p):
+    return (p.enabled, p.sample_rate, p.routes, p.interval)
+
+
+def test_configure_applies_and_clamps_values():
+    p = profiler.SamplingProfiler()
+    p.configure(enabled=True, sample_rate=2, routes=["dashboard"], interval=0)
+    assert settings(p) == (True, 1.0, {"dashboard"}, 0.001)
+    p.configure(enabled=False)
+    assert settings(p) == (False, 1.0, {"dashboard"}, 0.001)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"enabled": "false"},
+    {"enabled": 1},
+    {"sample_rate": "0.5"},
+    {"sample_rate": True},
+    {"interval": float("nan")},
+])
+def test_configure_rejects_bad_values_without_partial_changes(kwargs):
+    p = profiler.SamplingProfiler()
+    before = settings(p)
+    with pytest.raises((TypeError, ValueError)):
+        p.configure(**{"sample_rate": 0.5, "routes": ["dashboard"], "interval": 0.01, **kwargs})
+    assert settings(p) == before
+
+
+def test_should_profile_honours_enabled_and_routes():
+    p = profiler.SamplingProfiler()
+    assert not p.should_profile("dashboard")
+    p.configure(enabled=True, routes=["dashboard"])
+    assert p.should_profile("dashboard")
+    assert not p.should_profile("login")
+    assert not p.should_profile(None)
+
+
+def test_samples_registered_thread_under_its_route():
+    p = profiler.SamplingProfiler(interval=0.001)
+    done = threading.Event()
+
+    def work():
+        p.begin("dashboard")
+        done.wait(1)
+        p.end()
+
+    worker = threading.Thread(target=work)
+    worker.start()
+    time.sleep(0.05)
+    done.set()
+    worker.join()
+
+    summary = p.summary()["profiled"]["dashboard"]
+    assert summary["requests"] == 1 and summary["samples"] > 0
+    line = p.collapsed("dashboard").splitlines()[0]
+    assert line.startswith("dashboard;") and "test_profiler.py:work" in line
@@ -0,0 +1,18 @@
+import ratelimit
+
+
+def test_bucket_allows_burst_then_rejects_with_retry_after():
+    backend = ratelimit.MemoryBackend()
+    results = [backend.take("k", rate=1, burst=3) for _ in range(4)]
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert 0 < results[-1][1] <= 1
+
+
+def test_refund_restores_a_token_without_exceeding_burst():
+    backend = ratelimit.MemoryBackend()
+    backend.take("k", rate=0.001, burst=1)
+    assert backend.take("k", rate=0.001, burst=1)[0] is False
+    backend.refund("k", rate=0.001, burst=1)
+    backend.refund("k", rate=0.001, burst=1)
+    assert backend.take("k", rate=0.001, burst=1)[0] is True
+    assert backend.take("k", rate=0.001, burst=1)[0] is False
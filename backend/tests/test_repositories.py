@@ -0,0 +1,73 @@
+from repositories import BookingRepository, ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rows = []
+        self.rowcount = 1
+        self.closed = False
+
+    def execute(self, sql, params):
+        self.log.append((self, sql, params))
+        self.rows = [tuple(range(len(BookingRepository.columns)))] if sql.startswith("SELECT") else []
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.cursors = []
+
+    def cursor(self, prepared=False):
+        assert prepared
+        cur = FakeCursor(self.log)
+        self.cursors.append(cur)
+        return cur
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_repo(**pool_options):
+    conn = FakeConnection()
+    return BookingRepository(ConnectionPool(lambda: conn, **pool_options)), conn
+
+
+def test_update_reuses_one_prepared_cursor_per_column_subset():
+    repo, conn = make_repo()
+    repo.update(1, {"status": "approved", "budget": 10})
+    repo.update(2, {"budget": 20, "status": "pending", "ignored": 1})
+    assert len(conn.cursors) == 1
+    sql = conn.log[0][1]
+    assert sql == "UPDATE bookings SET budget=%s, status=%s WHERE id=%s"
+    assert conn.log[1][2] == (20, "pending", 2)
+
+
+def test_statement_cache_closes_least_recently_used_cursor():
+    repo, conn = make_repo(statement_cache=2)
+    repo.update(1, {"title": "a"})
+    repo.update(1, {"budget": 1})
+    repo.update(1, {"title": "b"})  # refreshes the title statement
+    repo.update(1, {"status": "x"})  # evicts the budget statement
+    title, budget, status = conn.cursors
+    assert budget.closed and not title.closed and not status.closed
+
+
+def test_get_returns_record_with_dict_style_access():
+    repo, _ = make_repo()
+    row = repo.get(5, client_id=7)
+    assert row.status == row["status"] == row.get("status") == 9
+    assert row.get("missing") is None
@@ -0,0 +1,58 @@
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import rollups
+
+
+def make_rows(seed, n=1500):
+    rng = random.Random(seed)
+    assignments, bookings, projects = [], [], []
+    for _ in range(n):
+        start = date(2024, 1, 1) + timedelta(days=rng.randint(0, 400))
+        end = start + timedelta(days=rng.randint(-3, 60))
+        assignments.append({
+            "employee_id": rng.choice([None, rng.randint(1, 40)]),
+            "start_date": rng.choice([start, str(start), None]),
+            "end_date": rng.choice([end, None]),
+            "status": rng.choice(["assigned", "working", "completed", "rejected"]),
+        })
+        bookings.append({
+            "budget": rng.choice([None, Decimal(f"{rng.randint(0, 99999)}.{rng.randint(0, 99):02d}")]),
+            "status": rng.choice(["pending", "approved", "completed", None]),
+            "created_at": datetime(2024, rng.randint(1, 12), rng.randint(1, 28), 9, 30),
+        })
+        projects.append({
+            "end_date": rng.choice([None, end]),
+            "status": rng.choice(["planned", "active", "completed", None]),
+            "created_at": datetime(2024, rng.randint(1, 12), 1),
+        })
+    return assignments, bookings, projects
+
+
+@pytest.mark.skipif(rollups.np is None, reason="numpy not installed")
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_numpy_rebuild_matches_incremental_accumulate(seed):
+    assignments, bookings, projects = make_rows(seed)
+    rebuilt = rollups.rebuild(assignments, bookings, projects)
+
+    assert rebuilt["assignments"] == rollups._accumulate(assignments, rollups.assignment_contrib)
+    assert rebuilt["bookings"] == rollups._accumulate(bookings, rollups.booking_contrib)
+    assert rebuilt["projects"] == rollups._accumulate(projects, rollups.project_contrib)
+
+
+def test_assignment_spanning_weeks_splits_days_per_week():
+    row = {"employee_id": 3, "start_date": date(2024, 1, 5), "end_date": date(2024, 1, 9), "status": "working"}
+    assert rollups.assignment_contrib(row) == {
+        (3, date(2024, 1, 1)): (3,),
+        (3, date(2024, 1, 8)): (2,),
+    }
+
+
+def test_diff_drops_cells_that_cancel_out():
+    before = {"employee_id": 3, "start_date": date(2024, 1, 5), "end_date": date(2024, 1, 9), "status": "working"}
+    after = {**before, "end_date": date(2024, 1, 12)}
+    delta = rollups.diff(rollups.assignment_contrib(before), rollups.assignment_contrib(after))
+    assert delta == {(3, date(2024, 1, 8)): (3,)}